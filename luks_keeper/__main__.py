@@ -0,0 +1,75 @@
+import sys
+
+# Commands (and flags) served without importing Click. Anything else is
+# handed to the Click group in luks_keeper.cli.
+_FAST_PATH = {"key", "mount", "unmount", "compile-config", "-h", "--help", "--version"}
+
+_CONFIG_HELP = "Path to config.yaml (default: ~/.config/luks-keeper/config.yaml)"
+
+
+def _build_parser():
+    """
+    Build an argparse mirror of the Click command tree for the hot commands.
+    """
+    import argparse
+    from . import __version__
+
+    parser = argparse.ArgumentParser(
+        prog="luks-keeper",
+        description="luks-keeper: Secure LUKS passphrase manager and optional snapshot tool.",
+    )
+    parser.add_argument(
+        "--version", action="version",
+        version=f"luks-keeper, version {__version__}",
+    )
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    key = sub.add_parser(
+        "key", help="Ensure or rotate the encrypted LUKS passphrase file for DEVICE."
+    )
+    key.add_argument("device")
+    key.add_argument(
+        "--rotate", action="store_true",
+        help="Rotate (re-encrypt) the passphrase file for a device",
+    )
+    key.add_argument("--config", dest="config_path", default=None, help=_CONFIG_HELP)
+
+    for name, help_text in (
+        ("mount", "Open all LUKS devices, mount them, and create snapshots if configured."),
+        ("unmount", "Unmount and close all LUKS devices."),
+        ("compile-config", "Bake the config into a Python module so later runs skip the YAML parse."),
+    ):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--config", dest="config_path", default=None, help=_CONFIG_HELP)
+
+    return parser
+
+
+def main():
+    """
+    Console entrypoint: dispatch the hot commands without loading Click.
+    """
+    argv = sys.argv[1:]
+    if argv and argv[0] not in _FAST_PATH:
+        from .cli import cli
+        return cli(prog_name="luks-keeper")
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+
+    from . import commands
+    if args.command == "key":
+        commands.key(args.device, args.rotate, args.config_path)
+    elif args.command == "mount":
+        commands.mount(args.config_path)
+    elif args.command == "unmount":
+        commands.unmount(args.config_path)
+    elif args.command == "compile-config":
+        commands.compile_config(args.config_path)
+
+
+if __name__ == "__main__":
+    main()
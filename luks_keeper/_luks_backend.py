@@ -0,0 +1,72 @@
+from typing import Optional
+
+from ._sudo import IS_ROOT
+
+try:
+    import pycryptsetup
+except ImportError:  # bindings are optional, fall back to the cryptsetup CLI
+    pycryptsetup = None
+
+
+class CryptsetupError(Exception):
+    """Raised when a libcryptsetup call returns an error code."""
+
+    def __init__(self, message: str, errno: int):
+        super().__init__(message)
+        # Positive errno value, e.g. errno.EEXIST for a taken mapper name
+        self.errno = errno
+
+
+class CryptsetupBackend:
+    """
+    In-process LUKS operations through the libcryptsetup Python bindings.
+
+    A backend wraps a single CryptSetup handle, so the LUKS header of the
+    device is read once and reused for every later call on it.
+    """
+
+    def __init__(self, devnode: str, name: str):
+        self.name = name
+        self._cs = pycryptsetup.CryptSetup(
+            device=devnode,
+            name=name,
+            yesDialog=lambda msg: True,
+            logFunc=lambda level, msg: None,
+        )
+
+    @staticmethod
+    def available() -> bool:
+        """
+        True when the bindings are importable and we can talk to device-mapper.
+        """
+        return pycryptsetup is not None and IS_ROOT
+
+    def activate(self, passphrase: str) -> None:
+        rc = self._cs.activate(name=self.name, passphrase=passphrase)
+        if rc < 0:
+            raise CryptsetupError(
+                f"Failed to activate '{self.name}' (error {rc})", -rc
+            )
+
+    def deactivate(self) -> None:
+        rc = self._cs.deactivate()
+        if rc < 0:
+            raise CryptsetupError(
+                f"Failed to deactivate '{self.name}' (error {rc})", -rc
+            )
+
+
+def get_backend(devnode: str, name: str) -> Optional[CryptsetupBackend]:
+    """
+    Return a libcryptsetup backend for the device, or None to use the CLI.
+
+    The handle is opened on the backing device, so it can't be built when
+    that disk is gone (unplugged, failed). The CLI is used then: luksClose
+    only needs the mapper name, so a stale mapping can still be closed.
+    """
+    if not CryptsetupBackend.available():
+        return None
+    try:
+        return CryptsetupBackend(devnode, name)
+    except Exception:
+        return None
@@ -0,0 +1,10 @@
+import os
+
+# Our effective uid doesn't change while we run, so check it only once
+IS_ROOT = os.geteuid() == 0
+
+def sudo_cmd(cmd: list) -> list:
+    """
+    Prepend 'sudo' to the command if not running as root.
+    """
+    return cmd if IS_ROOT else ["sudo", *cmd]
@@ -0,0 +1,19 @@
+import sys
+from typing import Optional
+
+# ANSI foreground colors used by the CLI
+_COLORS = {"red": 31, "green": 32, "yellow": 33}
+
+def echo(message: str = "") -> None:
+    """
+    Print a line to stdout, flushing so it interleaves with subprocess output.
+    """
+    print(message, flush=True)
+
+def secho(message: str, fg: Optional[str] = None) -> None:
+    """
+    Like echo, but colored with raw ANSI codes when stdout is a terminal.
+    """
+    if fg and sys.stdout.isatty():
+        message = f"\033[{_COLORS[fg]}m{message}\033[0m"
+    echo(message)
@@ -1,11 +1,8 @@
 import click
-from .config import load_config
-from .keys import PassphraseManager
-from .devices import LUKSDevice
-from .snaps import SnapshotManager
-from .hooks import run_hook, HookExecutionError
+from . import __version__, commands
 
 @click.group()
+@click.version_option(__version__, prog_name="luks-keeper")
 def cli():
     """
     luks-keeper: Secure LUKS passphrase manager and optional snapshot tool.
@@ -28,13 +25,7 @@ def manage_key(device: str, rotate: bool, config_path: str):
     """
     Ensure or rotate the encrypted LUKS passphrase file for DEVICE.
     """
-    cfg = load_config(config_path)
-    pm = PassphraseManager(cfg)
-
-    if rotate:
-        pm.rotate(device)
-    else:
-        pm.ensure_exists(device)
+    commands.key(device, rotate, config_path)
 
 @cli.command("mount")
 @click.option(
@@ -46,37 +37,7 @@ def mount_and_snapshot(config_path: str):
     """
     Open all LUKS devices, mount them, and create snapshots if configured.
     """
-    try:
-        cfg = load_config(config_path)
-        pm = PassphraseManager(cfg)
-
-        # 1) Run global pre-mount hook
-        run_hook(cfg, "on_before_mount_all")
-
-        # 2) Ensure passphrases exist and open each device
-        for dev_cfg in cfg.devices:
-            pm.ensure_exists(dev_cfg.name)
-            LUKSDevice(cfg, dev_cfg, pm).open()
-
-        # 3) Mount each device
-        for dev_cfg in cfg.devices:
-            LUKSDevice(cfg, dev_cfg, pm).mount()
-
-        # 4) If snapshot support is configured, prune old and create a new snapshot
-        if cfg.snapshot_root and cfg.devices:
-            source = cfg.devices[0].mount_point
-            snaps = SnapshotManager(cfg.snapshot_root, cfg.retention_days)
-            snaps.prune_old()
-            new_snap = snaps.create_auto_snapshot(source)
-            click.echo(f"Snapshot created at: {new_snap}")
-
-        # 5) Run global post-mount hook
-        run_hook(cfg, "on_after_mount_all")
-        click.secho("All devices mounted successfully.", fg="green")
-
-    except (FileNotFoundError, HookExecutionError) as e:
-        click.secho(f"Error: {e}", fg="red")
-        exit(1)
+    commands.mount(config_path)
 
 @cli.command("unmount")
 @click.option(
@@ -88,28 +49,19 @@ def unmount_all(config_path: str):
     """
     Unmount and close all LUKS devices.
     """
-    try:
-        cfg = load_config(config_path)
-        pm = PassphraseManager(cfg)
-
-        # 1) Run global pre-unmount hook
-        run_hook(cfg, "on_before_unmount_all")
-
-        # 2) Unmount each device (in reverse order)
-        for dev_cfg in reversed(cfg.devices):
-            LUKSDevice(cfg, dev_cfg, pm).unmount()
+    commands.unmount(config_path)
 
-        # 3) Close each device (in reverse order)
-        for dev_cfg in reversed(cfg.devices):
-            LUKSDevice(cfg, dev_cfg, pm).close()
-
-        # 4) Run global post-unmount hook
-        run_hook(cfg, "on_after_unmount_all")
-        click.secho("All devices unmounted successfully.", fg="green")
-
-    except (FileNotFoundError, HookExecutionError) as e:
-        click.secho(f"Error: {e}", fg="red")
-        exit(1)
+@cli.command("compile-config")
+@click.option(
+    "--config", "config_path",
+    default=None,
+    help="Path to config.yaml (default: ~/.config/luks-keeper/config.yaml)"
+)
+def compile_config(config_path: str):
+    """
+    Bake the config into a Python module so later runs skip the YAML parse.
+    """
+    commands.compile_config(config_path)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,199 @@
+# Implementations of the luks-keeper commands. They are plain functions so
+# the console entrypoint can run them without importing Click; the Click
+# commands in luks_keeper.cli are thin wrappers around the same functions.
+import os
+import sys
+from typing import Optional
+
+from ._term import echo, secho
+from .config import ConfigError, load_config
+
+# Heavier submodules are imported inside the commands that need them, so
+# `--help` and `key` don't pay for loading the snapshot and hook machinery.
+
+def _run_parallel(step, devices: list) -> None:
+    """
+    Run the coroutine step(dev, limit) for every device concurrently, then
+    re-raise the first failure.
+
+    Every device is allowed to finish, so a failure never leaves a
+    cryptsetup process running behind our back.
+    """
+    import asyncio
+
+    async def run_all():
+        # Cap parallel key derivation at one cryptsetup per CPU
+        limit = asyncio.Semaphore(os.cpu_count() or 1)
+        results = await asyncio.gather(
+            *(step(dev, limit) for dev in devices), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    asyncio.run(run_all())
+
+def _open_all(cfg, devices: list, pm) -> None:
+    """
+    Ensure passphrases exist and open every given (not yet open) device in parallel.
+    """
+    from .hooks import run_hooks_parallel
+
+    # Prompt for any missing passphrases before the concurrent opens start
+    for dev in devices:
+        pm.ensure_exists(dev.config.name)
+
+    # Pin the TTY once so concurrent gpg calls agree on where pinentry goes
+    if sys.stdin.isatty():
+        os.environ.setdefault("GPG_TTY", os.ttyname(sys.stdin.fileno()))
+
+    run_hooks_parallel(cfg, "on_before_open", [dev.config for dev in devices])
+    _run_parallel(lambda dev, limit: dev.open_async(limit, before_hook=False), devices)
+
+def _close_all(devices: list) -> None:
+    """
+    Close every given device in parallel.
+    """
+    _run_parallel(lambda dev, limit: dev.close_async(limit), devices)
+
+def _prepare_mount_points(cfg, devices: list) -> None:
+    """
+    Create the parent directories of all pending mount points in one pass.
+
+    Parents shared by several devices are created once; each device then
+    only has to create its own leaf directory when it is mounted. Parents
+    that live inside another pending mount point are left alone, since
+    they have to be created on the filesystem mounted there.
+
+    An on_before_mount hook may mount the filesystem a parent lives on, so
+    when any such hook is configured nothing is created up front and each
+    device creates its mount point after its hooks, as before.
+    """
+    if "on_before_mount" in cfg.hooks or any(
+        "on_before_mount" in d.config.hooks for d in devices
+    ):
+        return
+    mount_points = {os.path.abspath(d.config.mount_point) for d in devices}
+    parents = {os.path.dirname(mp) for mp in mount_points}
+    for parent in sorted(parents, key=len):
+        if any(parent == mp or parent.startswith(mp.rstrip("/") + "/")
+               for mp in mount_points):
+            continue
+        os.makedirs(parent, exist_ok=True)
+
+def key(device: str, rotate: bool = False, config_path: Optional[str] = None):
+    """
+    Ensure or rotate the encrypted LUKS passphrase file for DEVICE.
+    """
+    from .keys import PassphraseManager
+
+    try:
+        cfg = load_config(config_path)
+        pm = PassphraseManager(cfg)
+
+        if rotate:
+            pm.rotate(device)
+        else:
+            pm.ensure_exists(device)
+
+    except (FileNotFoundError, ConfigError) as e:
+        secho(f"Error: {e}", fg="red")
+        sys.exit(1)
+
+def mount(config_path: Optional[str] = None):
+    """
+    Open all LUKS devices, mount them, and create snapshots if configured.
+    """
+    from .keys import PassphraseManager
+    from .devices import LUKSDevice
+    from .snaps import SnapshotManager
+    from .hooks import run_hook, run_hooks_parallel, HookExecutionError
+    from ._luks_backend import CryptsetupError
+
+    try:
+        cfg = load_config(config_path)
+        pm = PassphraseManager(cfg)
+        devices = [LUKSDevice(cfg, d, pm) for d in cfg.devices]
+
+        # 1) Run global pre-mount hook
+        run_hook(cfg, "on_before_mount_all")
+
+        # Work out what is left to do from a single read of the mapper and
+        # mount tables, so an already-mounted system does no further work
+        to_open = [dev for dev in devices if not dev.is_open()]
+        to_mount = [
+            dev for dev in devices
+            if dev.config.mount_point and not dev.is_mounted()
+        ]
+
+        # 2) Ensure passphrases exist and open pending devices in parallel
+        if to_open:
+            _open_all(cfg, to_open, pm)
+
+        # 3) Mount pending devices (in order, mount points may be nested),
+        #    then run their post-mount hooks side by side
+        _prepare_mount_points(cfg, to_mount)
+        for dev in to_mount:
+            dev.mount(after_hook=False)
+        run_hooks_parallel(cfg, "on_after_mount", [dev.config for dev in to_mount])
+
+        # 4) If snapshot support is configured, prune old and create a new snapshot
+        if cfg.snapshot_root and cfg.devices:
+            source = cfg.devices[0].mount_point
+            snaps = SnapshotManager(cfg.snapshot_root, cfg.retention_days)
+            snaps.prune_old()
+            new_snap = snaps.create_auto_snapshot(source)
+            echo(f"Snapshot created at: {new_snap}")
+
+        # 5) Run global post-mount hook
+        run_hook(cfg, "on_after_mount_all")
+        secho("All devices mounted successfully.", fg="green")
+
+    except (FileNotFoundError, ConfigError, HookExecutionError, CryptsetupError) as e:
+        secho(f"Error: {e}", fg="red")
+        sys.exit(1)
+
+def unmount(config_path: Optional[str] = None):
+    """
+    Unmount and close all LUKS devices.
+    """
+    from .keys import PassphraseManager
+    from .devices import LUKSDevice
+    from .hooks import run_hook, HookExecutionError
+    from ._luks_backend import CryptsetupError
+
+    try:
+        cfg = load_config(config_path)
+        pm = PassphraseManager(cfg)
+        devices = [LUKSDevice(cfg, d, pm) for d in cfg.devices]
+
+        # 1) Run global pre-unmount hook
+        run_hook(cfg, "on_before_unmount_all")
+
+        # 2) Unmount each device (in reverse order)
+        for dev in reversed(devices):
+            dev.unmount()
+
+        # 3) Close all devices in parallel
+        _close_all(devices)
+
+        # 4) Run global post-unmount hook
+        run_hook(cfg, "on_after_unmount_all")
+        secho("All devices unmounted successfully.", fg="green")
+
+    except (FileNotFoundError, ConfigError, HookExecutionError, CryptsetupError) as e:
+        secho(f"Error: {e}", fg="red")
+        sys.exit(1)
+
+def compile_config(config_path: Optional[str] = None):
+    """
+    Bake the config into a Python module so later runs skip the YAML parse.
+    """
+    from .config import write_baked_config
+
+    try:
+        path = write_baked_config(config_path)
+    except (FileNotFoundError, ValueError) as e:
+        secho(f"Error: {e}", fg="red")
+        sys.exit(1)
+    echo(f"Compiled config written to: {path}")
@@ -1,73 +1,333 @@
 import os
-import yaml
+import hashlib
+import pickle
+import shlex
+from collections.abc import Sequence
+from functools import cached_property, lru_cache
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Optional, Dict, List
 
 # Default location for config file
 DEFAULT_CONFIG_PATH = Path.home() / ".config" / "luks-keeper" / "config.yaml"
 
+# Where parsed configs are cached between invocations
+CACHE_DIR = Path.home() / ".cache" / "luks-keeper"
+
+# Bump whenever the config dataclasses change shape
+_CACHE_VERSION = 3
+
+# Module written by `luks-keeper compile-config`
+BAKED_CONFIG_PATH = CACHE_DIR / "luks_keeper_baked.py"
+
+# A hook containing any of these needs a real shell to run
+_SHELL_CHARS = frozenset("|&;<>$`(){}[]*?~#!\n")
+
+# Shell builtins and keywords that must not be exec'd directly. Anything
+# missed here still works: hooks.py retries through the shell when the
+# executable is not found.
+_SHELL_BUILTINS = frozenset({
+    ".", ":", "alias", "break", "cd", "command", "continue", "eval",
+    "exec", "exit", "export", "getopts", "hash", "read", "readonly",
+    "return", "set", "shift", "source", "time", "times", "trap", "type",
+    "ulimit", "umask", "unset", "wait",
+})
+
+class ConfigError(ValueError):
+    """Custom exception for an invalid configuration file."""
+    pass
+
 @dataclass
 class HookConfig:
     command: str
     ignore_errors: bool = False
+    # Pre-split command, run without a shell unless `shell` is set
+    argv: List[str] = field(default_factory=list)
+    shell: bool = True
 
 @dataclass
 class DeviceConfig:
     name: str
     devnode: str
     mount_point: Optional[str]  # None or "none" to skip mounting
-    hooks: Dict[str, HookConfig] = field(default_factory=dict)
+    raw_hooks: dict = field(default_factory=dict, repr=False)
+
+    @cached_property
+    def hooks(self) -> Dict[str, HookConfig]:
+        """Device hooks, parsed the first time a hook is looked up."""
+        return _parse_hooks(self.raw_hooks)
 
 @dataclass
 class AppConfig:
-    devices: List[DeviceConfig]
+    devices: Sequence[DeviceConfig]
     snapshot_root: Optional[str]
     retention_days: int
     key_dir: str
     gpg_recipient: str
-    hooks: Dict[str, HookConfig] = field(default_factory=dict)
+    raw_hooks: dict = field(default_factory=dict, repr=False)
+
+    @cached_property
+    def hooks(self) -> Dict[str, HookConfig]:
+        """Global hooks, parsed the first time a hook is looked up."""
+        return _parse_hooks(self.raw_hooks)
+
+class _LazyDeviceList(Sequence):
+    """
+    Read-only list of DeviceConfig built from the raw YAML mappings.
+
+    Each entry is only turned into a DeviceConfig when it is first accessed,
+    so commands that never look at the devices don't pay for them.
+    """
+
+    def __init__(self, raw: list):
+        self._raw = raw
+        self._parsed = [None] * len(raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        dev = self._parsed[index]
+        if dev is None:
+            dev = self._parsed[index] = _parse_device(self._raw[index])
+        return dev
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+def _make_hook(name: str, command: str, ignore_errors: bool = False) -> HookConfig:
+    """
+    Build a HookConfig, deciding up front whether the command needs a shell.
+    """
+    try:
+        argv = shlex.split(command)
+    except ValueError as e:
+        raise ConfigError(f"Invalid command for hook '{name}': {e}") from None
+    shell = (
+        not argv
+        or any(c in _SHELL_CHARS for c in command)
+        or argv[0] in _SHELL_BUILTINS
+        or "=" in argv[0]  # leading VAR=value assignment
+    )
+    return HookConfig(
+        command=command,
+        ignore_errors=ignore_errors,
+        argv=argv,
+        shell=shell,
+    )
 
 def _parse_hooks(data: dict) -> Dict[str, HookConfig]:
     """Parse a dictionary of hooks into HookConfig objects."""
     hooks = {}
     for name, hook_data in data.items():
         if isinstance(hook_data, str):
-            hooks[name] = HookConfig(command=hook_data)
+            hooks[name] = _make_hook(name, hook_data)
         elif isinstance(hook_data, dict):
-            hooks[name] = HookConfig(
-                command=hook_data["command"],
+            hooks[name] = _make_hook(
+                name,
+                hook_data["command"],
                 ignore_errors=hook_data.get("ignore_errors", False),
             )
     return hooks
 
-def load_config(path: Optional[str] = None) -> AppConfig:
-    """Load YAML config from DEFAULT_CONFIG_PATH or given path."""
-    cfg_path = Path(path) if path else DEFAULT_CONFIG_PATH
-    if not cfg_path.exists():
-        raise FileNotFoundError(
-            f"Configuration file not found at {cfg_path}"
-        )
+def _check_hooks(cfg: AppConfig) -> None:
+    """
+    Parse every hook now, so a malformed command fails at load time instead
+    of in the middle of a mount.
+    """
+    cfg.hooks
+    for dev in cfg.devices:
+        dev.hooks
+
+def _parse_device(d: dict) -> DeviceConfig:
+    """Build a DeviceConfig from its raw YAML mapping."""
+    mp = d.get("mount_point")
+    # Treat "none" or empty as no mount
+    mp = None if mp in (None, "none", "") else mp
+    return DeviceConfig(
+        name=d["name"],
+        devnode=d["devnode"],
+        mount_point=mp,
+        raw_hooks=d.get("hooks") or {},
+    )
+
+def _yaml_loader():
+    """
+    Return the fastest safe YAML loader: libyaml's C loader if PyYAML was
+    built against it, the pure-Python SafeLoader otherwise.
+    """
+    try:
+        from yaml import CSafeLoader as _Loader
+    except ImportError:
+        from yaml import SafeLoader as _Loader
+    return _Loader
+
+def _read_yaml(cfg_path: Path) -> dict:
+    """Read the raw config mapping from the YAML file at cfg_path."""
+    # Imported here so warm starts served from the cache never load PyYAML
+    import yaml
+
     with open(cfg_path, "r") as f:
-        data = yaml.safe_load(f)
-
-    devices = []
-    for d in data.get("devices", []):
-        mp = d.get("mount_point")
-        # Treat "none" or empty as no mount
-        mp = None if mp in (None, "none", "") else mp
-        devices.append(DeviceConfig(
-            name=d["name"],
-            devnode=d["devnode"],
-            mount_point=mp,
-            hooks=_parse_hooks(d.get("hooks", {})),
-        ))
+        return yaml.load(f, Loader=_yaml_loader())
 
+def _parse_config(cfg_path: Path) -> AppConfig:
+    """Parse the YAML config file at cfg_path into an AppConfig."""
+    cfg = _build_config(_read_yaml(cfg_path))
+    # The parsed hooks are then cached along with the rest of the config
+    _check_hooks(cfg)
+    return cfg
+
+def _build_config(data: dict) -> AppConfig:
+    """Build an AppConfig from the raw config mapping."""
     return AppConfig(
-        devices=devices,
+        devices=_LazyDeviceList(data.get("devices") or []),
         snapshot_root=data.get("snapshot_root"),
         retention_days=int(data.get("retention_days", 30)),
         key_dir=os.path.expanduser(data.get("key_dir", "~/.luks-keeper/keys")),
         gpg_recipient=data["gpg_recipient"],
-        hooks=_parse_hooks(data.get("hooks", {})),
+        raw_hooks=data.get("hooks") or {},
+    )
+
+def _stat_key(st: os.stat_result) -> tuple:
+    """
+    Identify one version of the config file; any edit or replacement changes it.
+    """
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _baked_header(cfg_path: str, st: os.stat_result) -> str:
+    """
+    Second line of a baked module, naming the exact YAML version it was baked from.
+    """
+    return f"# Baked from {cfg_path!r} {_stat_key(st)!r}\n"
+
+def _load_baked(cfg_path: str, st: os.stat_result) -> Optional[AppConfig]:
+    """
+    Return the config baked by compile-config, if it was baked from exactly
+    the current version of the YAML file at cfg_path.
+
+    The header line is compared first, so a module baked from another file
+    or an older version is rejected without being executed.
+    """
+    import importlib.util
+
+    try:
+        with open(BAKED_CONFIG_PATH) as f:
+            f.readline()
+            header = f.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if header != _baked_header(cfg_path, st):
+        return None
+    spec = importlib.util.spec_from_file_location(
+        "luks_keeper_baked", BAKED_CONFIG_PATH
     )
+    baked = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(baked)
+        return baked.CONFIG
+    except Exception:
+        # A broken baked module must never stop us from reading the YAML
+        return None
+
+def write_baked_config(path: Optional[str] = None) -> Path:
+    """
+    Bake the YAML config into a Python module that load_config prefers.
+
+    The module holds the raw config mapping as a literal, so loading it
+    needs neither PyYAML nor a parse. It is ignored once the YAML file
+    is modified again.
+    """
+    import ast
+    from pprint import pformat
+
+    cfg_path = os.path.abspath(Path(path) if path else DEFAULT_CONFIG_PATH)
+    try:
+        st = os.stat(cfg_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Configuration file not found at {cfg_path}"
+        ) from None
+    data = _read_yaml(Path(cfg_path))
+
+    # Fail now, rather than on the next run, if the config is invalid
+    _check_hooks(_build_config(data))
+
+    literal = pformat(data)
+    try:
+        # Non-literal values (e.g. YAML dates) don't survive the round-trip
+        baked_ok = ast.literal_eval(literal) == data
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        baked_ok = False
+    if not baked_ok:
+        raise ValueError(
+            f"Configuration at {cfg_path} contains values that cannot be baked"
+        )
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = BAKED_CONFIG_PATH.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(
+            "# Generated by `luks-keeper compile-config`, do not edit.\n"
+            f"{_baked_header(cfg_path, st)}"
+            "from luks_keeper.config import _build_config\n\n"
+            f"DATA = {literal}\n\n"
+            "CONFIG = _build_config(DATA)\n"
+        )
+    os.replace(tmp, BAKED_CONFIG_PATH)
+    return BAKED_CONFIG_PATH
+
+@lru_cache(maxsize=None)
+def _cached_load(cfg_path: str) -> AppConfig:
+    """
+    Load the config at cfg_path, reusing a pickled copy while the file is unchanged.
+
+    A config baked by compile-config takes precedence. Otherwise the cache
+    entry is keyed on the file's mtime, size and inode, so any edit to the
+    YAML invalidates it. Cache I/O failures fall back to a plain parse.
+    """
+    try:
+        st = os.stat(cfg_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Configuration file not found at {cfg_path}"
+        ) from None
+
+    baked = _load_baked(cfg_path, st)
+    if baked is not None:
+        return baked
+
+    key = (_CACHE_VERSION, *_stat_key(st))
+    digest = hashlib.sha256(cfg_path.encode()).hexdigest()[:16]
+    cache_file = CACHE_DIR / f"config-{digest}.pkl"
+
+    try:
+        with open(cache_file, "rb") as f:
+            cached_key, cfg = pickle.load(f)
+        if cached_key == key:
+            return cfg
+    except Exception:
+        # Missing, corrupt or stale (e.g. a class moved): just re-parse
+        pass
+
+    cfg = _parse_config(Path(cfg_path))
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((key, cfg), f)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+    return cfg
+
+def load_config(path: Optional[str] = None) -> AppConfig:
+    """Load YAML config from DEFAULT_CONFIG_PATH or given path."""
+    cfg_path = Path(path) if path else DEFAULT_CONFIG_PATH
+    return _cached_load(os.path.abspath(cfg_path))
@@ -1,18 +1,95 @@
+import asyncio
+import contextlib
+import errno
 import os
+import re
 import subprocess
-from pathlib import Path
+from functools import lru_cache
+from typing import Optional
 from .keys import PassphraseManager
 from .config import AppConfig, DeviceConfig
 from .hooks import run_hook
-import click # Import click for secho
+from ._luks_backend import CryptsetupError, get_backend
+from ._sudo import sudo_cmd
+from ._term import secho
 
-def _sudo_cmd(cmd: list) -> list:
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+@lru_cache(maxsize=1)
+def _active_dm_names() -> frozenset:
+    """
+    Names of all active device-mapper targets, read once from sysfs.
+
+    Falls back to listing /dev/mapper when sysfs is not available.
+    """
+    names = set()
+    try:
+        entries = os.scandir("/sys/class/block")
+    except FileNotFoundError:
+        try:
+            return frozenset(os.listdir("/dev/mapper"))
+        except FileNotFoundError:
+            return frozenset()
+    with entries:
+        for entry in entries:
+            if not entry.name.startswith("dm-"):
+                continue
+            try:
+                with open(f"/sys/class/block/{entry.name}/dm/name") as f:
+                    names.add(f.read().strip())
+            except FileNotFoundError:
+                # Removed while we were scanning
+                continue
+    return frozenset(names)
+
+def _parse_mountinfo(lines) -> frozenset:
+    """
+    Extract the mount points from lines in /proc/self/mountinfo format.
+    """
+    points = set()
+    for line in lines:
+        # Field 5 is the mount point, with whitespace escaped as octal
+        mp = line.split(" ", 5)[4]
+        points.add(_OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), mp))
+    return frozenset(points)
+
+@lru_cache(maxsize=1)
+def _mountpoints() -> frozenset:
+    """
+    All current mount points, parsed once from /proc/self/mountinfo.
+    """
+    with open("/proc/self/mountinfo") as f:
+        return _parse_mountinfo(f)
+
+def _invalidate_state() -> None:
+    """
+    Drop the cached mapper/mount state after we changed it.
+    """
+    _active_dm_names.cache_clear()
+    _mountpoints.cache_clear()
+
+async def _run_async(cmd: list, input: Optional[bytes] = None, capture: bool = False) -> None:
     """
-    Prepend 'sudo' to the command if not running as root.
+    Run cmd as an asyncio subprocess, raising CalledProcessError like subprocess.run(check=True).
+
+    With capture=True the output is collected for the error instead of
+    going to our stdout/stderr.
     """
-    if os.geteuid() != 0:
-        return ["sudo"] + cmd
-    return cmd
+    out_pipe = subprocess.PIPE if capture else None
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=out_pipe,
+        stderr=out_pipe,
+    )
+    out, err = await proc.communicate(input)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode,
+            cmd,
+            out.decode(errors="replace") if out is not None else None,
+            err.decode(errors="replace") if err is not None else None,
+        )
 
 class LUKSDevice:
     """
@@ -28,71 +105,168 @@ class LUKSDevice:
         self.app_config = global_config
         self.config = device_config
         self.passman = passman
+        self._mapper = f"/dev/mapper/{device_config.name}"
+        self._cs = None
+        self._cs_checked = False
+
+    def _backend(self):
+        """
+        Return the memoized libcryptsetup backend, or None to shell out.
+        """
+        if not self._cs_checked:
+            self._cs = get_backend(self.config.devnode, self.config.name)
+            self._cs_checked = True
+        return self._cs
 
     def is_open(self) -> bool:
         """
         Check if the LUKS device is already opened.
         """
-        result = subprocess.run(
-            ["cryptsetup", "status", self.config.name],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        return result.returncode == 0
+        return self.config.name in _active_dm_names()
 
-    def open(self) -> None:
+    def open(self, before_hook: bool = True) -> None:
         """
         Open (decrypt) the LUKS device if not already open.
+
+        Pass before_hook=False when the caller already ran on_before_open.
         """
-        if not self.is_open():
-            run_hook(self.app_config, "on_before_open", self.config)
-            pw = self.passman.decrypt(self.config.name)
-            cmd = _sudo_cmd([
-                "cryptsetup", "luksOpen", self.config.devnode, self.config.name
-            ])
-            try:
-                subprocess.run(
-                    cmd,
-                    input=pw + "\n",
-                    text=True,
-                    check=True,
-                    capture_output=True,
-                )
-            except subprocess.CalledProcessError as e:
-                # Check if the error is due to the device mapper name already existing
-                if f"Device {self.config.name} already exists." in e.stderr:
-                    click.secho(
-                        f"Warning: Device mapper name '{self.config.name}' already exists "
-                        "but is not reported as an open LUKS device. "
-                        "Attempting to close it before re-opening.",
-                        fg="yellow"
-                    )
-                    try:
-                        # Attempt to close the conflicting device mapper entry
-                        subprocess.run(_sudo_cmd(["cryptsetup", "luksClose", self.config.name]), check=True)
-                        # Retry opening after closing
-                        subprocess.run(
-                            cmd,
-                            input=pw + "\n",
-                            text=True,
-                            check=True,
-                        )
-                    except subprocess.CalledProcessError as retry_e:
-                        click.secho(f"Error: Failed to open device '{self.config.name}' even after attempting to close a conflicting entry.", fg="red")
-                        raise retry_e # Re-raise the error if retry fails
-                else:
-                    raise e # Re-raise other CalledProcessError
-            run_hook(self.app_config, "on_after_open", self.config)
+        asyncio.run(self.open_async(before_hook=before_hook))
+
+    async def open_async(
+        self,
+        limit: Optional[asyncio.Semaphore] = None,
+        before_hook: bool = True,
+    ) -> None:
+        """
+        Coroutine behind `open`, so several devices can be opened concurrently.
+
+        If given, `limit` bounds how many devices run cryptsetup at once.
+        """
+        if self.is_open():
+            return
+        if before_hook:
+            await asyncio.to_thread(run_hook, self.app_config, "on_before_open", self.config)
+        # gpg runs in a thread so the loop keeps serving the other devices
+        pw = await asyncio.to_thread(self.passman.decrypt, self.config.name)
+        async with limit or contextlib.nullcontext():
+            backend = self._backend()
+            if backend is not None:
+                # In-process key derivation needs a thread to overlap
+                await asyncio.to_thread(self._backend_open, backend, pw)
+            else:
+                await self._luks_open(pw)
+        _invalidate_state()
+        await asyncio.to_thread(run_hook, self.app_config, "on_after_open", self.config)
+
+    def _open_cmd(self) -> list:
+        return sudo_cmd([
+            "cryptsetup", "luksOpen", self.config.devnode, self.config.name
+        ])
+
+    def _close_cmd(self) -> list:
+        return sudo_cmd(["cryptsetup", "luksClose", self.config.name])
+
+    async def _luks_open(self, pw: str) -> None:
+        """
+        Open the device by shelling out to `cryptsetup luksOpen`.
+        """
+        cmd = self._open_cmd()
+        try:
+            await _run_async(cmd, (pw + "\n").encode(), capture=True)
+        except subprocess.CalledProcessError as e:
+            # Rare conflict path, fine to handle with blocking calls
+            await asyncio.to_thread(self._recover_cli_open, cmd, pw, e)
+
+    def _recover_cli_open(self, cmd: list, pw: str, e: subprocess.CalledProcessError) -> None:
+        """
+        Handle a failed `cryptsetup luksOpen`: recover from a stale device
+        mapper entry holding our name, otherwise re-raise.
+        """
+        # Check if the error is due to the device mapper name already existing
+        if f"Device {self.config.name} already exists." not in e.stderr:
+            raise e # Re-raise other CalledProcessError
+        self._recover_stale_mapping(
+            close=lambda: subprocess.run(self._close_cmd(), check=True),
+            retry=lambda: subprocess.run(
+                cmd,
+                input=pw + "\n",
+                text=True,
+                check=True,
+            ),
+        )
+
+    def _backend_open(self, backend, pw: str) -> None:
+        """
+        Open the device in-process, recovering from a stale mapping like the CLI path.
+        """
+        try:
+            backend.activate(pw)
+        except CryptsetupError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            self._recover_stale_mapping(
+                close=backend.deactivate,
+                retry=lambda: backend.activate(pw),
+            )
+
+    def _is_live_crypt_device(self) -> bool:
+        """
+        Ask cryptsetup itself whether our mapper name is an active crypt device.
+        """
+        try:
+            status = subprocess.run(
+                ["cryptsetup", "status", self.config.name],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            return False
+        return status.returncode == 0
+
+    def _recover_stale_mapping(self, close, retry) -> None:
+        """
+        Our device mapper name is already taken. Leave it alone if it is a live
+        crypt device (e.g. opened concurrently after we read sysfs), otherwise
+        close the conflicting entry and retry the open once.
+        """
+        if self._is_live_crypt_device():
+            return
+        secho(
+            f"Warning: Device mapper name '{self.config.name}' already exists "
+            "but is not reported as an open LUKS device. "
+            "Attempting to close it before re-opening.",
+            fg="yellow"
+        )
+        try:
+            # Attempt to close the conflicting device mapper entry
+            close()
+            # Retry opening after closing
+            retry()
+        except (subprocess.CalledProcessError, CryptsetupError) as retry_e:
+            secho(f"Error: Failed to open device '{self.config.name}' even after attempting to close a conflicting entry.", fg="red")
+            raise retry_e # Re-raise the error if retry fails
 
     def close(self) -> None:
         """
         Close (re-encrypt) the LUKS device if it's open.
         """
-        if self.is_open():
-            run_hook(self.app_config, "on_before_close", self.config)
-            cmd = _sudo_cmd(["cryptsetup", "luksClose", self.config.name])
-            subprocess.run(cmd, check=True)
-            run_hook(self.app_config, "on_after_close", self.config)
+        asyncio.run(self.close_async())
+
+    async def close_async(self, limit: Optional[asyncio.Semaphore] = None) -> None:
+        """
+        Coroutine behind `close`, so several devices can be closed concurrently.
+        """
+        if not self.is_open():
+            return
+        await asyncio.to_thread(run_hook, self.app_config, "on_before_close", self.config)
+        async with limit or contextlib.nullcontext():
+            backend = self._backend()
+            if backend is not None:
+                await asyncio.to_thread(backend.deactivate)
+            else:
+                await _run_async(self._close_cmd())
+        _invalidate_state()
+        await asyncio.to_thread(run_hook, self.app_config, "on_after_close", self.config)
 
     def is_mounted(self) -> bool:
         """
@@ -100,26 +274,34 @@ class LUKSDevice:
         """
         if not self.config.mount_point:
             return False
-        return subprocess.run(
-            ["mountpoint", "-q", self.config.mount_point]
-        ).returncode == 0
+        return os.path.realpath(self.config.mount_point) in _mountpoints()
 
-    def mount(self) -> None:
+    def mount(self, after_hook: bool = True) -> None:
         """
         Mount the opened device at the mount point, if configured.
+
+        Pass after_hook=False when the caller runs on_after_mount itself.
         """
         if self.config.mount_point and not self.is_mounted():
             run_hook(self.app_config, "on_before_mount", self.config)
-            Path(self.config.mount_point).mkdir(parents=True, exist_ok=True)
-            cmd = _sudo_cmd([
-                "mount", f"/dev/mapper/{self.config.name}", self.config.mount_point
+            try:
+                os.mkdir(self.config.mount_point)
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                # Parents weren't prepared (or sit on a fresh mount)
+                os.makedirs(self.config.mount_point, exist_ok=True)
+            cmd = sudo_cmd([
+                "mount", self._mapper, self.config.mount_point
             ])
             try:
                 subprocess.run(cmd, check=True, capture_output=True, text=True)
             except subprocess.CalledProcessError as e:
-                click.secho(f"Error mounting device {self.config.name}: {e.stderr}", fg="red")
+                secho(f"Error mounting device {self.config.name}: {e.stderr}", fg="red")
                 raise e
-            run_hook(self.app_config, "on_after_mount", self.config)
+            _invalidate_state()
+            if after_hook:
+                run_hook(self.app_config, "on_after_mount", self.config)
 
     def unmount(self) -> None:
         """
@@ -127,8 +309,9 @@ class LUKSDevice:
         """
         if self.config.mount_point and self.is_mounted():
             run_hook(self.app_config, "on_before_unmount", self.config)
-            cmd = _sudo_cmd(["umount", self.config.mount_point])
+            cmd = sudo_cmd(["umount", self.config.mount_point])
             subprocess.run(cmd, check=True)
+            _invalidate_state()
             run_hook(self.app_config, "on_after_unmount", self.config)
 
     def ensure_open_and_mounted(self) -> None:
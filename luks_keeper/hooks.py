@@ -1,32 +1,109 @@
 import subprocess
-import click
+import sys
+import threading
+from collections import deque
+from ._term import echo, secho
 from typing import List, Optional
 from .config import HookConfig, AppConfig, DeviceConfig
 
+# How many trailing stderr lines to keep for error reports
+_STDERR_TAIL = 64
+
 class HookExecutionError(Exception):
     """Custom exception for failed hook execution."""
     pass
 
-def _run_command(command: str, ignore_errors: bool):
-    """
-    Executes a single shell command.
-    """
-    try:
-        subprocess.run(
-            command,
-            shell=True,
-            check=not ignore_errors,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-    except subprocess.CalledProcessError as e:
-        click.secho(f"Error executing command: {command}", fg="red")
-        click.secho(f"STDOUT: {e.stdout}", fg="red")
-        click.secho(f"STDERR: {e.stderr}", fg="red")
-        raise HookExecutionError(
-            f"Command '{command}' failed with exit code {e.returncode}"
-        ) from e
+class _RunningHook:
+    """
+    A hook command started in the background.
+
+    Output goes straight to our own stdout/stderr instead of being buffered.
+    When failures matter, stderr is additionally teed through a reader thread
+    that keeps the last few lines for the error message.
+    """
+
+    def __init__(self, hook: HookConfig):
+        self.command = hook.command
+        self.ignore_errors = hook.ignore_errors
+        self._tail = None
+        self._reader = None
+        self._start_error = None
+        stderr = None if hook.ignore_errors else subprocess.PIPE
+        try:
+            if hook.shell:
+                self._proc = subprocess.Popen(hook.command, shell=True, stderr=stderr)
+            else:
+                # Simple commands are exec'd directly, saving the /bin/sh round-trip
+                try:
+                    self._proc = subprocess.Popen(hook.argv, stderr=stderr)
+                except FileNotFoundError:
+                    # Not an executable: maybe a shell builtin or keyword
+                    # (`read`, `type`, `command -v`, ...). Let the shell
+                    # decide, which also reports a missing command as 127.
+                    self._proc = subprocess.Popen(hook.command, shell=True, stderr=stderr)
+        except OSError as e:
+            # e.g. /bin/sh itself could not be started
+            self._proc = None
+            self._start_error = e
+            return
+        if not hook.ignore_errors:
+            self._tail = deque(maxlen=_STDERR_TAIL)
+            self._reader = threading.Thread(target=self._pump_stderr, daemon=True)
+            self._reader.start()
+
+    def _pump_stderr(self):
+        # Read bytes and decode leniently: the pipe must be drained to EOF
+        # whatever the hook prints, or the hook blocks once it fills up
+        with self._proc.stderr as pipe:
+            for raw in pipe:
+                line = raw.decode(errors="replace")
+                self._tail.append(line)
+                try:
+                    sys.stderr.write(line)
+                    sys.stderr.flush()
+                except (OSError, ValueError):
+                    # Our own stderr is gone; keep draining regardless
+                    pass
+
+    def wait(self):
+        """
+        Wait for the command to finish, raising HookExecutionError on failure.
+        """
+        if self._proc is None:
+            if self.ignore_errors:
+                return
+            secho(f"Error executing command: {self.command}", fg="red")
+            raise HookExecutionError(
+                f"Command '{self.command}' could not be started: {self._start_error}"
+            )
+        returncode = self._proc.wait()
+        if self._reader is not None:
+            self._reader.join()
+        if returncode != 0 and not self.ignore_errors:
+            secho(f"Error executing command: {self.command}", fg="red")
+            secho(f"STDERR (last lines): {''.join(self._tail)}", fg="red")
+            raise HookExecutionError(
+                f"Command '{self.command}' failed with exit code {returncode}"
+            )
+
+def _run_command(hook: HookConfig):
+    """
+    Executes a single hook command.
+    """
+    _RunningHook(hook).wait()
+
+def _wait_all(running: List[_RunningHook]):
+    """
+    Wait for every started hook, then re-raise the first failure.
+    """
+    error = None
+    for hook in running:
+        try:
+            hook.wait()
+        except HookExecutionError as e:
+            error = error or e
+    if error is not None:
+        raise error
 
 def run_hook(
     config: AppConfig,
@@ -39,11 +116,39 @@ def run_hook(
     # Global hook
     if hook_name in config.hooks:
         hook = config.hooks[hook_name]
-        click.echo(f"Running global hook '{hook_name}': {hook.command}")
-        _run_command(hook.command, hook.ignore_errors)
+        echo(f"Running global hook '{hook_name}': {hook.command}")
+        _run_command(hook)
 
     # Device-specific hook
     if device and hook_name in device.hooks:
         hook = device.hooks[hook_name]
-        click.echo(f"Running device hook '{hook_name}' for {device.name}: {hook.command}")
-        _run_command(hook.command, hook.ignore_errors)
\ No newline at end of file
+        echo(f"Running device hook '{hook_name}' for {device.name}: {hook.command}")
+        _run_command(hook)
+
+def run_hooks_parallel(
+    config: AppConfig,
+    hook_name: str,
+    devices: List[DeviceConfig],
+):
+    """
+    Run a per-device hook for several devices at once.
+
+    Equivalent to calling run_hook for each device, except that the commands
+    for different devices run concurrently. For every device the global hook
+    still finishes before its device-specific hook starts.
+    """
+    if hook_name in config.hooks:
+        hook = config.hooks[hook_name]
+        running = []
+        for device in devices:
+            echo(f"Running global hook '{hook_name}' for {device.name}: {hook.command}")
+            running.append(_RunningHook(hook))
+        _wait_all(running)
+
+    running = []
+    for device in devices:
+        if hook_name in device.hooks:
+            hook = device.hooks[hook_name]
+            echo(f"Running device hook '{hook_name}' for {device.name}: {hook.command}")
+            running.append(_RunningHook(hook))
+    _wait_all(running)
@@ -1,5 +1,6 @@
 import os
 import subprocess
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
 import getpass
@@ -25,16 +26,22 @@ class FileKeyStore(KeyStore):
     def __init__(self, key_dir: str, gpg_recipient: str):
         self.dir = Path(os.path.expanduser(key_dir))
         self.dir.mkdir(parents=True, exist_ok=True)
+        self._dir_str = str(self.dir)
         self.recipient = gpg_recipient
 
-    def _path(self, name: str) -> Path:
-        return self.dir / f"luks-pass_{name}.gpg"
+    def _path(self, name: str) -> str:
+        # Plain string join, cheaper than building a Path for every probe
+        return f"{self._dir_str}/luks-pass_{name}.gpg"
 
     def exists(self, name: str) -> bool:
-        return self._path(name).exists()
+        try:
+            os.stat(self._path(name))
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        return True
 
     def get(self, name: str) -> str:
-        path = str(self._path(name))
+        path = self._path(name)
         result = subprocess.run(
             ["gpg", "--quiet", "--batch", "--decrypt", path],
             capture_output=True, check=True
@@ -42,7 +49,7 @@ class FileKeyStore(KeyStore):
         return result.stdout.decode().strip()
 
     def set(self, name: str, plaintext: str) -> None:
-        path = str(self._path(name))
+        path = self._path(name)
         # --yes to overwrite, --pinentry-mode=loopback if you want loopback prompting
         subprocess.run(
             [
@@ -59,25 +66,37 @@ class PassphraseManager:
 
     def __init__(self, config: AppConfig):
         self.store = FileKeyStore(config.key_dir, config.gpg_recipient)
+        # Serializes decryption so parallel opens never race for pinentry
+        self._decrypt_lock = threading.Lock()
+        # Keyfile existence per device, probed at most once per command
+        self._exists = {}
+
+    def _has_keyfile(self, device: str) -> bool:
+        if device not in self._exists:
+            self._exists[device] = self.store.exists(device)
+        return self._exists[device]
 
     def ensure_exists(self, device: str):
         """If no keyfile exists for `device`, prompt & create it."""
-        if not self.store.exists(device):
+        if not self._has_keyfile(device):
             pw = getpass.getpass(f"Enter LUKS passphrase for '{device}': ")
             self.store.set(device, pw)
+            self._exists[device] = True
             print(f"Encrypted keyfile created for '{device}'")
 
     def rotate(self, device: str):
         """Force overwrite of an existing keyfile (with confirmation)."""
-        if self.store.exists(device):
+        if self._has_keyfile(device):
             ans = input(f"Overwrite keyfile for '{device}'? [y/N]: ")
             if ans.lower() != "y":
                 print("Aborted rotation.")
                 return
         pw = getpass.getpass(f"Enter new LUKS passphrase for '{device}': ")
         self.store.set(device, pw)
+        self._exists[device] = True
         print(f"Keyfile for '{device}' has been rotated.")
 
     def decrypt(self, device: str) -> str:
         """Return the plaintext passphrase for `device` (prompts GPG)."""
-        return self.store.get(device)
+        with self._decrypt_lock:
+            return self.store.get(device)
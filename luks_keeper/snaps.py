@@ -2,15 +2,31 @@ import os
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import Optional
 
+from ._sudo import sudo_cmd
 
-def _sudo_cmd(cmd: list) -> list:
+def _parse_snapshot_name(name: str) -> Optional[datetime]:
     """
-    Prepend 'sudo' to the command if not running as root.
+    Decode a YYYY-MM-DD_hh-mm-ss snapshot name, or return None if it isn't one.
+
+    The format is fixed-width, so slicing the fields out is much cheaper
+    than running datetime.strptime for every entry.
     """
-    if os.geteuid() != 0:
-        return ['sudo'] + cmd
-    return cmd
+    if (len(name) != 19 or name[4] != "-" or name[7] != "-" or name[10] != "_"
+            or name[13] != "-" or name[16] != "-"):
+        return None
+    digits = name[0:4] + name[5:7] + name[8:10] + name[11:13] + name[14:16] + name[17:19]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    try:
+        return datetime(
+            int(name[0:4]), int(name[5:7]), int(name[8:10]),
+            int(name[11:13]), int(name[14:16]), int(name[17:19]),
+        )
+    except ValueError:
+        # e.g. month 13
+        return None
 
 class SnapshotManager:
     """
@@ -31,21 +47,25 @@ class SnapshotManager:
         """
         Delete snapshots older than retention_days.
         """
-        now = datetime.now()
-        for sub in self.base_path.iterdir():
-            if not sub.is_dir():
-                continue
-            # Expect directory names like YYYY-MM-DD_hh-mm-ss
-            try:
-                ts = datetime.strptime(sub.name, "%Y-%m-%d_%H-%M-%S")
-            except ValueError:
-                # Skip non-timestamped dirs
-                continue
-            age = now - ts
-            if age > timedelta(days=self.retention_days):
-                print(f"Deleting old snapshot: {sub}")
-                cmd = _sudo_cmd(["btrfs", "subvolume", "delete", str(sub)])
-                subprocess.run(cmd, check=True)
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        victims = []
+        with os.scandir(self.base_path) as entries:
+            for entry in entries:
+                # d_type from the dirent, no extra stat per entry
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                # Expect directory names like YYYY-MM-DD_hh-mm-ss
+                ts = _parse_snapshot_name(entry.name)
+                if ts is None:
+                    # Skip non-timestamped dirs
+                    continue
+                if ts < cutoff:
+                    print(f"Deleting old snapshot: {entry.path}")
+                    victims.append(entry.path)
+        if victims:
+            # btrfs accepts several subvolumes in one invocation
+            cmd = sudo_cmd(["btrfs", "subvolume", "delete", *victims])
+            subprocess.run(cmd, check=True)
 
     def create_auto_snapshot(self, source: str) -> str:
         """
@@ -56,7 +76,7 @@ class SnapshotManager:
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         dest = self.base_path / ts
         print(f"Creating snapshot: {dest}")
-        cmd = _sudo_cmd([
+        cmd = sudo_cmd([
             "btrfs", "subvolume", "snapshot", "-r", source, str(dest)
         ])
         subprocess.run(cmd, check=True)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from luks_keeper.commands import _prepare_mount_points
+from luks_keeper.config import AppConfig, DeviceConfig
+
+
+def _cfg(raw_hooks=None):
+    return AppConfig(
+        devices=[], snapshot_root=None, retention_days=7,
+        key_dir="/tmp", gpg_recipient="x", raw_hooks=raw_hooks or {},
+    )
+
+
+def _devices(*mount_points, raw_hooks=None):
+    return [
+        SimpleNamespace(config=DeviceConfig(
+            name=f"d{i}", devnode=f"/dev/d{i}", mount_point=mp,
+            raw_hooks=raw_hooks or {},
+        ))
+        for i, mp in enumerate(mount_points)
+    ]
+
+
+def test_bare_relative_mount_point(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _prepare_mount_points(_cfg(), _devices("mp"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_relative_mount_point_with_parents(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _prepare_mount_points(_cfg(), _devices("a/b/mp"))
+    assert (tmp_path / "a" / "b").is_dir()
+    assert not (tmp_path / "a" / "b" / "mp").exists()
+
+
+def test_shared_parent_created_once(tmp_path):
+    base = tmp_path / "mnt"
+    _prepare_mount_points(_cfg(), _devices(str(base / "one"), str(base / "two")))
+    assert base.is_dir()
+    assert list(base.iterdir()) == []
+
+
+def test_nested_mount_point_parents_are_left_to_the_outer_mount(tmp_path):
+    outer = tmp_path / "data"
+    inner = outer / "sub" / "inner"
+    _prepare_mount_points(_cfg(), _devices(str(outer), str(inner)))
+    assert tmp_path.is_dir()
+    assert not outer.exists()
+
+
+def test_before_mount_hook_disables_the_pre_pass(tmp_path):
+    mp = tmp_path / "a" / "mp"
+    _prepare_mount_points(
+        _cfg({"on_before_mount": "true"}), _devices(str(mp))
+    )
+    assert not (tmp_path / "a").exists()
+
+
+def test_device_before_mount_hook_disables_the_pre_pass(tmp_path):
+    mp = tmp_path / "a" / "mp"
+    _prepare_mount_points(
+        _cfg(), _devices(str(mp), raw_hooks={"on_before_mount": "true"})
+    )
+    assert not (tmp_path / "a").exists()
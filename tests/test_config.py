@@ -0,0 +1,201 @@
+import os
+
+import pytest
+
+from luks_keeper import config
+from luks_keeper.config import ConfigError, _make_hook
+
+
+@pytest.mark.parametrize("command, argv", [
+    ("echo hello", ["echo", "hello"]),
+    ("systemctl stop 'my service'", ["systemctl", "stop", "my service"]),
+    ("/usr/bin/true", ["/usr/bin/true"]),
+])
+def test_simple_commands_skip_the_shell(command, argv):
+    hook = _make_hook("h", command)
+    assert not hook.shell
+    assert hook.argv == argv
+
+
+@pytest.mark.parametrize("command", [
+    "echo a | tee log",
+    "echo $HOME",
+    "test -d /mnt && echo yes",
+    "ls *.gpg",
+    "echo done # comment",
+    "FOO=1 env",
+    "",
+])
+def test_shell_syntax_needs_the_shell(command):
+    assert _make_hook("h", command).shell
+
+
+@pytest.mark.parametrize("command", [
+    "cd /tmp", "read x", "type ls", "command -v foo", "time sleep 1",
+    "hash", "getopts ab opt", "umask 077",
+])
+def test_builtins_and_keywords_need_the_shell(command):
+    assert _make_hook("h", command).shell
+
+
+def test_unterminated_quote_is_a_config_error():
+    with pytest.raises(ConfigError, match="hook 'h'"):
+        _make_hook("h", "echo 'oops")
+
+
+CONFIG_YAML = """\
+devices:
+  - name: data
+    devnode: /dev/sdb1
+    mount_point: /mnt/data
+gpg_recipient: me@example.com
+"""
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(config, "CACHE_DIR", cache)
+    monkeypatch.setattr(config, "BAKED_CONFIG_PATH", cache / "luks_keeper_baked.py")
+    config._cached_load.cache_clear()
+    yield cache
+    config._cached_load.cache_clear()
+
+
+@pytest.fixture
+def cfg_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG_YAML)
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Record every real YAML parse done by _cached_load."""
+    calls = []
+    real = config._parse_config
+
+    def counting(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(config, "_parse_config", counting)
+    return calls
+
+
+def _load(path):
+    # Bypass the in-process memo so every call goes to the on-disk cache
+    config._cached_load.cache_clear()
+    return config._cached_load(str(path))
+
+
+def test_cache_hit_while_unchanged(cache_dir, cfg_file, parses):
+    first = _load(cfg_file)
+    second = _load(cfg_file)
+    assert len(parses) == 1
+    assert second.devices[0].devnode == first.devices[0].devnode == "/dev/sdb1"
+
+
+def test_cache_miss_after_mtime_change(cache_dir, cfg_file, parses):
+    _load(cfg_file)
+    st = os.stat(cfg_file)
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+    _load(cfg_file)
+    assert len(parses) == 2
+
+
+def test_cache_miss_after_size_change(cache_dir, cfg_file, parses):
+    _load(cfg_file)
+    st = os.stat(cfg_file)
+    cfg_file.write_text(CONFIG_YAML.replace("/dev/sdb1", "/dev/sdc1") + "retention_days: 5\n")
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    cfg = _load(cfg_file)
+    assert len(parses) == 2
+    assert cfg.devices[0].devnode == "/dev/sdc1"
+
+
+def test_cache_miss_after_inode_change(cache_dir, cfg_file, parses):
+    _load(cfg_file)
+    st = os.stat(cfg_file)
+    # Same size and mtime, but a different file renamed into place
+    replacement = cfg_file.with_name("new.yaml")
+    replacement.write_text(CONFIG_YAML.replace("/dev/sdb1", "/dev/sdc1"))
+    os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(replacement, cfg_file)
+    assert os.stat(cfg_file).st_ino != st.st_ino
+    cfg = _load(cfg_file)
+    assert len(parses) == 2
+    assert cfg.devices[0].devnode == "/dev/sdc1"
+
+
+@pytest.mark.parametrize("garbage", [
+    b"",
+    b"not a pickle",
+    b"cluks_keeper_gone\nAppConfig\n.",  # references a class that moved
+])
+def test_corrupt_cache_falls_back_to_parse(cache_dir, cfg_file, parses, garbage):
+    _load(cfg_file)
+    (cache_file,) = cache_dir.glob("config-*.pkl")
+    cache_file.write_bytes(garbage)
+    cfg = _load(cfg_file)
+    assert len(parses) == 2
+    assert cfg.devices[0].devnode == "/dev/sdb1"
+
+
+def test_unwritable_cache_dir(tmp_path, monkeypatch, cfg_file, parses):
+    # A file where the cache directory should be: mkdir fails even as root
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    monkeypatch.setattr(config, "CACHE_DIR", blocker / "cache")
+    monkeypatch.setattr(config, "BAKED_CONFIG_PATH", blocker / "cache" / "baked.py")
+    cfg = _load(cfg_file)
+    assert cfg.devices[0].devnode == "/dev/sdb1"
+    _load(cfg_file)
+    assert len(parses) == 2
+    config._cached_load.cache_clear()
+
+
+def test_baked_config_used_when_path_and_key_match(cache_dir, cfg_file, parses):
+    config.write_baked_config(str(cfg_file))
+    cfg = _load(cfg_file)
+    assert parses == []
+    assert cfg.devices[0].devnode == "/dev/sdb1"
+
+
+def test_baked_config_for_another_file_is_not_executed(cache_dir, tmp_path, cfg_file, parses):
+    baked = config.write_baked_config(str(cfg_file))
+    marker = tmp_path / "executed"
+    with open(baked, "a") as f:
+        f.write(f"open({str(marker)!r}, 'w').close()\n")
+    other = tmp_path / "other.yaml"
+    other.write_text(CONFIG_YAML)
+    _load(other)
+    assert len(parses) == 1
+    assert not marker.exists()
+
+
+def test_baked_config_ignored_after_edit(cache_dir, cfg_file, parses):
+    config.write_baked_config(str(cfg_file))
+    st = os.stat(cfg_file)
+    cfg_file.write_text(CONFIG_YAML.replace("/dev/sdb1", "/dev/sdc1"))
+    # Even an edit that moves the mtime backwards
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+    cfg = _load(cfg_file)
+    assert len(parses) == 1
+    assert cfg.devices[0].devnode == "/dev/sdc1"
+
+
+def test_non_literal_values_cannot_be_baked(cache_dir, cfg_file):
+    cfg_file.write_text(CONFIG_YAML + "installed: 2024-01-01\n")
+    with pytest.raises(ValueError, match="cannot be baked"):
+        config.write_baked_config(str(cfg_file))
+    assert not config.BAKED_CONFIG_PATH.exists()
+
+
+def test_broken_baked_module_falls_back_to_yaml(cache_dir, cfg_file, parses):
+    baked = config.write_baked_config(str(cfg_file))
+    with open(baked, "a") as f:
+        f.write("this is not python\n")
+    cfg = _load(cfg_file)
+    assert len(parses) == 1
+    assert cfg.devices[0].devnode == "/dev/sdb1"
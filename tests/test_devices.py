@@ -0,0 +1,32 @@
+import os
+
+from luks_keeper.devices import _mountpoints, _parse_mountinfo
+
+
+def test_parses_mount_points():
+    lines = [
+        "22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/sda2 rw\n",
+        "35 22 253:0 / /mnt/data rw,relatime shared:2 - btrfs /dev/mapper/data rw\n",
+    ]
+    assert _parse_mountinfo(lines) == {"/", "/mnt/data"}
+
+
+def test_decodes_octal_escapes():
+    lines = [
+        r"36 22 253:1 / /mnt/my\040disk rw - ext4 /dev/mapper/a rw" "\n",
+        r"37 22 253:2 / /mnt/tab\011and\134slash rw - ext4 /dev/mapper/b rw" "\n",
+        r"38 22 253:3 / /mnt/new\012line rw - ext4 /dev/mapper/c rw" "\n",
+    ]
+    assert _parse_mountinfo(lines) == {
+        "/mnt/my disk", "/mnt/tab\tand\\slash", "/mnt/new\nline",
+    }
+
+
+def test_leaves_other_backslashes_alone():
+    lines = [r"39 22 253:4 / /mnt/a\9b rw - ext4 /dev/mapper/d rw" "\n"]
+    assert _parse_mountinfo(lines) == {r"/mnt/a\9b"}
+
+
+def test_root_is_mounted():
+    _mountpoints.cache_clear()
+    assert os.path.realpath("/") in _mountpoints()
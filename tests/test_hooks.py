@@ -0,0 +1,24 @@
+import pytest
+
+from luks_keeper.config import HookConfig, _make_hook
+from luks_keeper.hooks import HookExecutionError, _run_command
+
+
+def test_failing_hook_reports_undecodable_stderr():
+    # Well past a pipe buffer of invalid UTF-8: the reader must keep draining
+    hook = _make_hook("h", "head -c 200000 /dev/zero | tr '\\0' '\\377' >&2; exit 3", False)
+    with pytest.raises(HookExecutionError, match="exit code 3"):
+        _run_command(hook)
+
+
+def test_unlisted_builtin_falls_back_to_the_shell():
+    # Classified for direct exec, but there is no `umask` executable
+    hook = HookConfig(command="umask 077", argv=["umask", "077"], shell=False)
+    _run_command(hook)
+
+
+def test_missing_command_fails_like_the_shell():
+    hook = _make_hook("h", "luks-keeper-no-such-command")
+    assert not hook.shell
+    with pytest.raises(HookExecutionError, match="exit code 127"):
+        _run_command(hook)
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from luks_keeper import _luks_backend
+
+
+def _fake_bindings(monkeypatch, crypt_setup):
+    monkeypatch.setattr(_luks_backend, "pycryptsetup", SimpleNamespace(CryptSetup=crypt_setup))
+    monkeypatch.setattr(_luks_backend, "IS_ROOT", True)
+
+
+def test_uses_bindings_when_available(monkeypatch):
+    _fake_bindings(monkeypatch, lambda **kwargs: object())
+    backend = _luks_backend.get_backend("/dev/sdx", "data")
+    assert isinstance(backend, _luks_backend.CryptsetupBackend)
+
+
+def test_missing_device_falls_back_to_the_cli(monkeypatch):
+    def crypt_setup(**kwargs):
+        raise OSError(2, "No such file or directory")
+    _fake_bindings(monkeypatch, crypt_setup)
+    assert _luks_backend.get_backend("/dev/gone", "data") is None
+
+
+def test_no_bindings_uses_the_cli(monkeypatch):
+    monkeypatch.setattr(_luks_backend, "pycryptsetup", None)
+    assert _luks_backend.get_backend("/dev/sdx", "data") is None
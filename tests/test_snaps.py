@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pytest
+
+from luks_keeper.snaps import _parse_snapshot_name
+
+
+def test_parses_snapshot_names():
+    assert _parse_snapshot_name("2024-02-29_23-59-07") == datetime(2024, 2, 29, 23, 59, 7)
+
+
+def test_agrees_with_strptime():
+    name = "1999-12-31_00-00-00"
+    assert _parse_snapshot_name(name) == datetime.strptime(name, "%Y-%m-%d_%H-%M-%S")
+
+
+@pytest.mark.parametrize("name", [
+    "2024-13-01_00-00-00",  # month out of range
+    "2024-00-10_00-00-00",
+    "2023-02-29_00-00-00",  # not a leap year
+    "2024-01-01_24-00-00",
+    "2024-01-01_00-60-00",
+    "2024-01-01_00-00-00.old",
+    "2024-01-01 00-00-00",
+    "2024-01-01_00-00-0x",
+    "2024-01-01_00-00-+1",
+    "2024-01-01_00-00-١٢",  # non-ASCII digits
+    "manual-snapshot",
+    "",
+])
+def test_rejects_other_names(name):
+    assert _parse_snapshot_name(name) is None